@@ -1,7 +1,23 @@
+import asyncio
+import atexit
+import json
 import logging
+import logging.handlers
 import os # Import the 'os' module to access environment variables
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import queue
+import sys
+from cachetools import TTLCache
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+from telegram.error import TelegramError
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes
+from telegram.request import HTTPXRequest
+
+# orjson (a C extension) parses the Bot API's JSON much faster than the
+# stdlib; fall back gracefully if it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- Configuration ---
 # We will get the bot token from an environment variable for security.
@@ -89,14 +105,178 @@ PRODUCTS = {
 }
 
 
-# --- Bot Logic ---
+# --- Flat Product Index ---
+# One dict keyed by (category_key, product_key) replaces the nested
+# PRODUCTS[...]["items"][...] lookups: a single hash probe per access and a
+# convenient flat view for building the tables below.
+PRODUCT_INDEX = {
+    (category_key, product_key): product
+    for category_key, category_data in PRODUCTS.items()
+    for product_key, product in category_data["items"].items()
+}
+
+
+# --- Callback Data Codes ---
+# Telegram resends callback_data with every button press, so keep it tiny:
+# "c<n>" selects a category, "p<n>" shows a product, "a<n>" adds it to the
+# cart and "b" goes back to the category list. The tables below translate
+# the numeric part of a code back into catalog keys.
+CATEGORY_IDS = {category_key: f"c{i}" for i, category_key in enumerate(PRODUCTS)}
+ID_TO_CATEGORY = {code[1:]: category_key for category_key, code in CATEGORY_IDS.items()}
+
+PRODUCT_IDS = {key: f"p{i}" for i, key in enumerate(PRODUCT_INDEX)}
+ID_TO_PRODUCT = {code[1:]: key for key, code in PRODUCT_IDS.items()}
+
+# Intern the strings in the lookup tables so the catalog keys they return
+# are the same objects as the literals used elsewhere in the module. Note
+# this does not speed up the per-callback probe itself: the lookup key is a
+# fresh code[1:] slice, so the comparison is still by value.
+ID_TO_CATEGORY = {sys.intern(id_): sys.intern(category_key) for id_, category_key in ID_TO_CATEGORY.items()}
+ID_TO_PRODUCT = {
+    sys.intern(id_): (sys.intern(category_key), sys.intern(product_key))
+    for id_, (category_key, product_key) in ID_TO_PRODUCT.items()
+}
+
 
-# Enable logging to see errors
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+class CachedDictMarkup(InlineKeyboardMarkup):
+    """InlineKeyboardMarkup whose to_dict() result is computed only once.
+
+    PTB walks the whole button graph and builds a fresh dict every time a
+    markup is serialized into an outgoing request. All the keyboards in
+    this bot are static module-level constants, so that work can happen a
+    single time. The cache is keyed by id(), which is safe because every
+    instance lives for the lifetime of the process.
+    """
+
+    _cache: dict[int, dict] = {}
+
+    def to_dict(self, recursive: bool = True) -> dict:
+        cached = CachedDictMarkup._cache.get(id(self))
+        if cached is None:
+            cached = super().to_dict(recursive)
+            CachedDictMarkup._cache[id(self)] = cached
+        return cached
+
+
+# --- Precomputed Keyboards ---
+# The catalog is static, so the category keyboard never changes. Build it once
+# at import time instead of rebuilding it on every /start and "Back" press.
+CATEGORY_KEYBOARD = CachedDictMarkup(
+    [[InlineKeyboardButton(category_data["name"], callback_data=CATEGORY_IDS[category_key])]
+     for category_key, category_data in PRODUCTS.items()]
 )
+
+# Likewise, the product list for each category is fixed, so build one markup
+# (and its header text) per category up front instead of per click.
+CATEGORY_MARKUPS = {
+    category_key: CachedDictMarkup(
+        [[InlineKeyboardButton(product_data["name"], callback_data=PRODUCT_IDS[(category_key, product_key)])]
+         for product_key, product_data in category_data["items"].items()]
+        + [[InlineKeyboardButton("⬅️ Back to Categories", callback_data="b")]]
+    )
+    for category_key, category_data in PRODUCTS.items()
+}
+
+CATEGORY_TITLES = {
+    category_key: f"Showing products in {category_data['name']}:"
+    for category_key, category_data in PRODUCTS.items()
+}
+
+# Product pages are also fully static: caption, keyboard and image URL can all
+# be rendered once per product instead of on every click.
+def _render_product_page(key: tuple[str, str], product: dict) -> tuple[str, InlineKeyboardMarkup, str]:
+    """Renders the static caption, keyboard and image URL for one product."""
+    category_key = key[0]
+    caption = (
+        f"🌟 *{product['name']}*\n\n"
+        f"_{product['description']}_\n\n"
+        f"💰 *Price: ${product['price']:.2f}*"
+    )
+    markup = CachedDictMarkup([
+        # In the next phase, this button will add the item to the cart
+        [InlineKeyboardButton("🛒 Add to Cart", callback_data="a" + PRODUCT_IDS[key][1:])],
+        [InlineKeyboardButton(f"⬅️ Back to {PRODUCTS[category_key]['name']}", callback_data=CATEGORY_IDS[category_key])]
+    ])
+    return caption, markup, product["image_url"]
+
+
+PRODUCT_DETAILS: dict[tuple[str, str], tuple[str, InlineKeyboardMarkup, str]] = {
+    key: _render_product_page(key, product) for key, product in PRODUCT_INDEX.items()
+}
+
+# Warm the serialization cache so even the first request skips the to_dict walk.
+for _markup in (CATEGORY_KEYBOARD, *CATEGORY_MARKUPS.values(), *(d[1] for d in PRODUCT_DETAILS.values())):
+    _markup.to_dict()
+del _markup
+
+
+# --- Image file_id Cache ---
+# The first time a product photo is sent, Telegram fetches image_url
+# server-side and hands back a file_id that can be reused forever. Cache
+# those per product so every later send skips the remote fetch, and persist
+# them so restarts keep the benefit.
+FILE_ID_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_file_ids.json")
+
+
+def _load_image_file_ids() -> dict[tuple[str, str], str]:
+    """Loads the persisted file_id cache, returning an empty dict if absent."""
+    try:
+        with open(FILE_ID_CACHE_PATH, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {tuple(key.split("/", 1)): file_id for key, file_id in raw.items()}
+
+
+def _save_image_file_ids() -> None:
+    """Writes the file_id cache back to disk."""
+    try:
+        with open(FILE_ID_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"/".join(key): file_id for key, file_id in IMAGE_FILE_IDS.items()}, f)
+    except OSError:
+        logger.warning("Could not persist image file_id cache to %s", FILE_ID_CACHE_PATH)
+
+
+IMAGE_FILE_IDS: dict[tuple[str, str], str] = _load_image_file_ids()
+
+
+# --- Bot Logic ---
+
+# Enable logging to see errors. Records are handed off through a queue to a
+# background listener thread, so formatting and the stderr write happen off
+# the event loop instead of blocking a handler mid-await. The QueueHandler is
+# attached directly (not via basicConfig, which would install a formatter on
+# it and bake that into the record before the listener formats it again);
+# only the listener's StreamHandler formats.
+_log_queue = queue.SimpleQueue()
+_log_root = logging.getLogger()
+_log_root.setLevel(logging.INFO)
+_log_root.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
+class ORJSONRequest(HTTPXRequest):
+    """HTTPXRequest that parses Bot API responses with orjson when available.
+
+    parse_json_payload is PTB's documented hook for swapping the JSON
+    parser; every Update and API reply goes through it.
+    """
+
+    @staticmethod
+    def parse_json_payload(payload: bytes):
+        if orjson is None:
+            return HTTPXRequest.parse_json_payload(payload)
+        try:
+            return orjson.loads(payload)
+        except ValueError as exc:
+            logger.exception("Can not load invalid JSON data")
+            raise TelegramError("Invalid server response") from exc
+
+
 # Handler for the /start command
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends a welcome message and displays product categories."""
@@ -106,96 +286,129 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "I'm your personal assistant for exploring our beautiful gems and jewelry. "
         "Please select a category to begin browsing:"
     )
-    
-    keyboard = []
-    # Create a button for each category
-    for category_key, category_data in PRODUCTS.items():
-        button = InlineKeyboardButton(category_data["name"], callback_data=f"category_{category_key}")
-        keyboard.append([button])
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text(welcome_message, reply_markup=reply_markup)
+    await update.message.reply_text(welcome_message, reply_markup=CATEGORY_KEYBOARD)
+
+# Telegram clients can resend the same callback query within a few hundred
+# milliseconds of a double-click. Remember recently handled (user, data)
+# pairs briefly so duplicates only get an acknowledgement, not a second
+# round of message edits. No locking needed: the event loop is
+# single-threaded.
+RECENT_CALLBACKS = TTLCache(maxsize=4096, ttl=0.5)
+
 
 # Handler for all button clicks (callbacks)
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Parses the CallbackQuery and shows the relevant content."""
     query = update.callback_query
-    await query.answer() # Acknowledge the button press
 
-    # Using a more robust way to handle callbacks
-    parts = query.data.split('_', 2)
-    query_type = parts[0]
+    dedupe_key = (update.effective_user.id, query.data)
+    if dedupe_key in RECENT_CALLBACKS:
+        await query.answer()
+        return
+    RECENT_CALLBACKS[dedupe_key] = True
+
+    # Acknowledging the press and producing the new content are independent
+    # Bot API calls, so run them concurrently instead of paying two
+    # round-trips back to back.
+    ack = asyncio.create_task(query.answer())
 
-    if query_type == "category":
-        category_key = parts[1]
-        await show_products_in_category(query, category_key)
-    elif query_type == "product":
-        category_key = parts[1]
-        product_key = parts[2]
-        await show_product_details(query, category_key, product_key)
-    elif query_type == "back":
-        await go_back_to_categories(query)
+    # Callback data is a one-letter kind followed by a numeric ID, so a pair
+    # of slices replaces the old split-and-compare parsing, and the kind
+    # letter indexes straight into the DISPATCH table.
+    try:
+        code = query.data
+        handler = DISPATCH.get(code[0])
+        if handler:
+            await handler(query, code[1:])
+    finally:
+        await ack
 
 
 async def show_products_in_category(query, category_key: str):
     """Displays all products within a selected category."""
-    category = PRODUCTS.get(category_key)
-    if not category:
+    reply_markup = CATEGORY_MARKUPS.get(category_key)
+    if not reply_markup:
         await query.edit_message_text("Sorry, category not found.")
         return
 
-    keyboard = []
-    for product_key, product_data in category["items"].items():
-        button = InlineKeyboardButton(product_data["name"], callback_data=f"product_{category_key}_{product_key}")
-        keyboard.append([button])
-    
-    # Add a "Back" button
-    keyboard.append([InlineKeyboardButton("⬅️ Back to Categories", callback_data="back_categories")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(f"Showing products in {category['name']}:", reply_markup=reply_markup)
+    if query.message.photo:
+        # A photo message (product page) cannot be edited into text, so
+        # replace it with a fresh list message.
+        await asyncio.gather(
+            query.message.reply_text(CATEGORY_TITLES[category_key], reply_markup=reply_markup),
+            query.message.delete()
+        )
+    else:
+        await query.edit_message_text(CATEGORY_TITLES[category_key], reply_markup=reply_markup)
 
 
 async def show_product_details(query, category_key: str, product_key: str):
     """Displays the details of a single product with an image."""
-    product = PRODUCTS.get(category_key, {}).get("items", {}).get(product_key)
-    if not product:
+    key = (category_key, product_key)
+    try:
+        caption, reply_markup, image_url = PRODUCT_DETAILS[key]
+    except KeyError:
         await query.edit_message_text("Sorry, product not found.")
         return
-        
-    caption = (
-        f"🌟 *{product['name']}*\n\n"
-        f"_{product['description']}_\n\n"
-        f"💰 *Price: ${product['price']:.2f}*"
-    )
-    
-    keyboard = [
-        # In the next phase, this button will add the item to the cart
-        [InlineKeyboardButton("🛒 Add to Cart", callback_data=f"add_{category_key}_{product_key}")],
-        [InlineKeyboardButton(f"⬅️ Back to {PRODUCTS[category_key]['name']}", callback_data=f"category_{category_key}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    # Send photo with the details as a caption
-    await query.message.reply_photo(
-        photo=product['image_url'],
-        caption=caption,
-        parse_mode='Markdown',
-        reply_markup=reply_markup
-    )
-    # Delete the previous message (the product list) for a cleaner interface
-    await query.message.delete()
+
+    # Prefer the cached Telegram file_id; fall back to the URL on first send.
+    photo = IMAGE_FILE_IDS.get(key, image_url)
+
+    if query.message.photo:
+        # Already on a photo message (another product page): swap the media
+        # in place with a single API call instead of a send + delete pair.
+        message = await query.edit_message_media(
+            media=InputMediaPhoto(media=photo, caption=caption, parse_mode='Markdown'),
+            reply_markup=reply_markup
+        )
+    else:
+        # Coming from the text-only product list, so a photo message has to
+        # be sent fresh; delete the old list concurrently for a cleaner
+        # interface.
+        message, _ = await asyncio.gather(
+            query.message.reply_photo(
+                photo=photo,
+                caption=caption,
+                parse_mode='Markdown',
+                reply_markup=reply_markup
+            ),
+            query.message.delete()
+        )
+
+    # Remember the file_id Telegram assigned on the first successful send.
+    if key not in IMAGE_FILE_IDS and getattr(message, "photo", None):
+        IMAGE_FILE_IDS[key] = message.photo[-1].file_id
+        _save_image_file_ids()
 
 
 async def go_back_to_categories(query):
     """Edits the message to show the main category list again."""
-    keyboard = []
-    for category_key, category_data in PRODUCTS.items():
-        button = InlineKeyboardButton(category_data["name"], callback_data=f"category_{category_key}")
-        keyboard.append([button])
-        
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text("Please select a category to continue browsing:", reply_markup=reply_markup)
+    if query.message.photo:
+        await asyncio.gather(
+            query.message.reply_text("Please select a category to continue browsing:", reply_markup=CATEGORY_KEYBOARD),
+            query.message.delete()
+        )
+    else:
+        await query.edit_message_text("Please select a category to continue browsing:", reply_markup=CATEGORY_KEYBOARD)
+
+
+# Thin adapters between a callback code's ID part and the display functions.
+async def _handle_category(query, rest: str):
+    await show_products_in_category(query, ID_TO_CATEGORY.get(rest, ""))
+
+
+async def _handle_product(query, rest: str):
+    category_key, product_key = ID_TO_PRODUCT.get(rest, ("", ""))
+    await show_product_details(query, category_key, product_key)
+
+
+async def _handle_back(query, rest: str):
+    await go_back_to_categories(query)
+
+
+# Jump table mapping the kind letter of a callback code to its handler.
+DISPATCH = {"c": _handle_category, "p": _handle_product, "b": _handle_back}
 
 
 def main() -> None:
@@ -203,9 +416,27 @@ def main() -> None:
     if not BOT_TOKEN:
         logger.error("FATAL: BOT_TOKEN environment variable not set.")
         return
-        
+
+    # Use uvloop's libuv-based event loop when available. The handlers are
+    # all short and I/O-bound, so a faster loop speeds up everything without
+    # touching any handler code.
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.info("uvloop not installed; using the default asyncio event loop.")
+
+
     # Create the Application and pass it your bot's token.
-    application = Application.builder().token(BOT_TOKEN).build()
+    # A larger keep-alive connection pool with HTTP/2 lets bursts of callback
+    # answers/edits reuse TLS connections instead of handshaking serially.
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(ORJSONRequest(connection_pool_size=64, pool_timeout=1.0, http_version="2"))
+        .get_updates_request(ORJSONRequest(connection_pool_size=16, http_version="2"))
+        .build()
+    )
 
     # on different commands - answer in Telegram
     application.add_handler(CommandHandler("start", start))
@@ -213,9 +444,22 @@ def main() -> None:
     # on callback queries, run the button_handler
     application.add_handler(CallbackQueryHandler(button_handler))
 
-    # Run the bot until the user presses Ctrl-C
+    # Run the bot until the user presses Ctrl-C.
+    # On Render (which sets RENDER_EXTERNAL_URL), receive updates over a
+    # webhook: Telegram pushes them to us over an open connection instead of
+    # us paying a TLS round-trip per getUpdates poll. Locally, where no
+    # public URL exists, fall back to long-polling.
     print("Bot is running...")
-    application.run_polling()
+    webhook_base = os.environ.get("RENDER_EXTERNAL_URL")
+    if webhook_base:
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.environ.get("PORT", "8443")),
+            url_path=BOT_TOKEN,
+            webhook_url=f"{webhook_base}/{BOT_TOKEN}",
+        )
+    else:
+        application.run_polling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""One-shot helper that takes placehold.co out of the serving path.
+
+The catalog's image_urls point at placehold.co, which renders each image on
+demand, so the first Telegram-side fetch of every product photo is slow.
+Run this script once to download every image into assets/ and, if BOT_TOKEN
+and PREWARM_CHAT_ID are set, upload each one to Telegram straight away so
+the bot's file_id cache is already populated before the first customer
+clicks a product.
+
+Usage:
+    python scripts/prewarm_images.py                   # download only
+    BOT_TOKEN=... PREWARM_CHAT_ID=... python scripts/prewarm_images.py
+"""
+
+import asyncio
+import os
+import sys
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+
+def _request_url(url: str) -> str:
+    """Prepares a catalog image URL for urllib.
+
+    Two fixes are needed: the URLs omit a format extension (placehold.co
+    then serves SVG, which Telegram's sendPhoto rejects), so append .png;
+    and several carry raw Burmese text in the query string, which urllib
+    passes through untouched and http.client then fails to encode into the
+    ASCII request line — percent-encode the path and query.
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path
+    if not path.endswith(".png"):
+        path += ".png"
+    return urllib.parse.urlunsplit((
+        parts.scheme,
+        parts.netloc,
+        urllib.parse.quote(path),
+        urllib.parse.quote(parts.query, safe="=&+"),
+        parts.fragment,
+    ))
+
+
+def download_images() -> dict[tuple[str, str], str]:
+    """Downloads every product image into assets/, returning key -> path."""
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    paths = {}
+    for (category_key, product_key), product in bot.PRODUCT_INDEX.items():
+        path = os.path.join(ASSETS_DIR, f"{category_key}_{product_key}.png")
+        if not os.path.exists(path):
+            url = _request_url(product["image_url"])
+            print(f"Downloading {url} -> {path}")
+            urllib.request.urlretrieve(url, path)
+        paths[(category_key, product_key)] = path
+    return paths
+
+
+async def upload_images(paths: dict[tuple[str, str], str], token: str, chat_id: str) -> None:
+    """Uploads each image once and records the returned file_ids."""
+    from telegram import Bot
+
+    async with Bot(token) as tg:
+        for key, path in paths.items():
+            if key in bot.IMAGE_FILE_IDS:
+                continue
+            with open(path, "rb") as f:
+                message = await tg.send_photo(chat_id=chat_id, photo=f)
+            bot.IMAGE_FILE_IDS[key] = message.photo[-1].file_id
+            # Persist after every upload so a mid-run failure keeps what was
+            # already obtained and a re-run resumes where it stopped.
+            bot._save_image_file_ids()
+            print(f"Cached file_id for {key}")
+
+
+def main() -> None:
+    paths = download_images()
+    token = os.environ.get("BOT_TOKEN")
+    chat_id = os.environ.get("PREWARM_CHAT_ID")
+    if token and chat_id:
+        asyncio.run(upload_images(paths, token, chat_id))
+        print(f"Wrote file_id cache to {bot.FILE_ID_CACHE_PATH}")
+    else:
+        print("BOT_TOKEN/PREWARM_CHAT_ID not set; skipped the Telegram upload step.")
+
+
+if __name__ == "__main__":
+    main()